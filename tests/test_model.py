@@ -0,0 +1,94 @@
+"""
+Unit tests for the eager Transformer model
+"""
+
+# Third Party
+import pytest
+import torch
+
+# Local
+from torchchat.model import KVCache, Transformer, TransformerArgs
+
+## Helpers #####################################################################
+
+
+def _tiny_args(**overrides):
+    args = dict(n_layers=2, n_heads=4, dim=64, vocab_size=128)
+    args.update(overrides)
+    return TransformerArgs(**args)
+
+
+def _run_prefill_and_decode(model, prompt_len=6):
+    model.eval()
+    model.setup_caches(1, 32)
+    tokens = torch.arange(prompt_len).view(1, prompt_len) % model.config.vocab_size
+    with torch.no_grad():
+        prefill = model(tokens, torch.arange(prompt_len))
+        decode = model(torch.tensor([[3]]), torch.tensor([prompt_len]))
+    return prefill, decode
+
+
+## Tests #######################################################################
+
+
+def test_explicit_head_dim_forward():
+    """head_dim != dim // n_heads must size the projections and run."""
+    model = Transformer(_tiny_args(head_dim=32))
+    assert model.config.head_dim == 32
+    attention = model.layers[0].attention
+    assert attention.wqkv.out_features == (4 + 2 * 4) * 32
+    assert attention.wo.in_features == 4 * 32
+    prefill, decode = _run_prefill_and_decode(model)
+    assert prefill.shape == (1, 6, 128)
+    assert decode.shape == (1, 1, 128)
+    assert torch.isfinite(prefill).all() and torch.isfinite(decode).all()
+
+
+def test_compile_for_decode_matches_eager():
+    """compile_for_decode must run prefill and decode and match eager logits."""
+    torch.manual_seed(0)
+    eager = Transformer(_tiny_args())
+    compiled = Transformer(_tiny_args())
+    compiled.load_state_dict(
+        {k: v for k, v in eager.state_dict().items() if "kv_cache" not in k},
+        strict=False,
+    )
+    eager_prefill, eager_decode = _run_prefill_and_decode(eager)
+
+    compiled.eval()
+    compiled.setup_caches(1, 32)
+    compiled.compile_for_decode()
+    compiled_prefill, compiled_decode = _run_prefill_and_decode(compiled)
+
+    assert torch.allclose(compiled_prefill, eager_prefill, atol=1e-4)
+    assert torch.allclose(compiled_decode, eager_decode, atol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "dtype,max_rel_err",
+    [(torch.float8_e4m3fn, 0.08), (torch.int8, 0.02)],
+)
+def test_quantized_kv_cache_roundtrip(dtype, max_rel_err):
+    """Quantized caches must dequantize back to the stored values closely."""
+    torch.manual_seed(0)
+    cache = KVCache(1, 16, 2, 8, dtype=dtype)
+    k = torch.randn(1, 2, 3, 8)
+    v = torch.randn(1, 2, 3, 8)
+    cache.update(torch.arange(3), k, v, start=0)
+    k_back = cache.dequantize(cache.k_cache, cache.k_scale, torch.float32)[:, :, :3]
+    v_back = cache.dequantize(cache.v_cache, cache.v_scale, torch.float32)[:, :, :3]
+    for original, restored in ((k, k_back), (v, v_back)):
+        rel_err = (original - restored).abs().max() / original.abs().max()
+        assert rel_err < max_rel_err, rel_err
+    # scattered-position fallback writes scales too
+    cache.update(torch.tensor([5, 9]), k[:, :, :2], v[:, :, :2])
+    k_back = cache.dequantize(cache.k_cache, cache.k_scale, torch.float32)
+    rel_err = (k[:, :, :2] - k_back[:, :, [5, 9]]).abs().max() / k.abs().max()
+    assert rel_err < max_rel_err, rel_err
+
+
+def test_derived_head_dim_unchanged():
+    model = Transformer(_tiny_args())
+    assert model.config.head_dim == 16
+    prefill, decode = _run_prefill_and_decode(model)
+    assert torch.isfinite(prefill).all() and torch.isfinite(decode).all()
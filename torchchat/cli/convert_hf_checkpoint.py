@@ -16,6 +16,9 @@ wd = Path(__file__).parent.parent
 sys.path.append(str(wd.resolve()))
 sys.path.append(str((wd / "build").resolve()))
 
+# compiled once: the remap loop below runs these against every checkpoint key
+_LAYER_NUM_RE = re.compile(r"\d+")
+
 
 def convert_hf_checkpoint(
     *,
@@ -153,8 +156,10 @@ def convert_hf_checkpoint(
     final_result = {}
     for key, value in merged_result.items():
         if "layers" in key:
-            abstract_key = re.sub(r"(\d+)", "{}", key)
-            layer_num = re.search(r"\d+", key).group(0)
+            # one scan per key: the abstract key and the layer number come
+            # from the same precompiled pattern
+            layer_num = _LAYER_NUM_RE.search(key).group(0)
+            abstract_key = _LAYER_NUM_RE.sub("{}", key)
             new_key = weight_map[abstract_key]
             if new_key is None:
                 continue
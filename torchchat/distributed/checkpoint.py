@@ -15,9 +15,7 @@ from torch.distributed.device_mesh import DeviceMesh
 
 STATE_DICT_SHARDING_DIM_MAP = {
     "tok_embeddings.weight": 0,
-    "attention.wq.weight" : 0,
-    "attention.wk.weight" : 0,
-    "attention.wv.weight" : 0,
+    "attention.wqkv.weight" : 0,
     "attention.wo.weight" : 1,
     "feed_forward.w1.weight" : 0,
     "feed_forward.w2.weight" : 1,
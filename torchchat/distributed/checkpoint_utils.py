@@ -17,7 +17,7 @@ from pathlib import Path
 from torch.distributed._tensor import DTensor
 from torchchat.distributed.dtensor_utils import convert_to_dtensor
 from torchchat.cli.builder import BuilderArgs, _load_checkpoint
-from torchchat.model import ModelArgs
+from torchchat.model import interleave_qkv_for_tp, ModelArgs
 
 
 _DEFAULT_SAFETENSOR_FILE_NAME = "model.safetensors.index.json"
@@ -173,8 +173,12 @@ def load_safetensor_weights(
         stage_state_dict = purge_fqn_prefix(stage_state_dict, "model.")
         weight_map = purge_fqn_prefix(weight_map, "model.")
 
-    needed_files = get_needed_files(stage_state_dict, weight_map)
+    needed_files = get_needed_files(
+        stage_state_dict, weight_map, get_layer_id_offset(model_config)
+    )
     updated_states: Set[str] = set()
+    # staging area for fused-qkv pieces whose q/k/v tensors span shard files
+    pending_qkv: Dict[str, Dict[str, torch.Tensor]] = {}
 
     for file in needed_files:
         full_path = os.path.join(file_location, file)
@@ -189,6 +193,7 @@ def load_safetensor_weights(
                 model_config=model_config,
                 new_to_old_keymap=new_to_old_keymap,
                 updated_states=updated_states,
+                pending_qkv=pending_qkv,
             )
         except FileNotFoundError:
             logger.error(f"File not found: {full_path}")
@@ -229,10 +234,23 @@ def purge_fqn_prefix(
 
 
 def get_needed_files(
-    state_dict: Dict[str, torch.Tensor], weight_map: Dict[str, str]
+    state_dict: Dict[str, torch.Tensor],
+    weight_map: Dict[str, str],
+    layer_id_offset: int = 0,
 ) -> Set[str]:
     needed_files = set()
     for param in state_dict.keys():
+        param = to_original_layer_fqn(param, layer_id_offset)
+        if "wqkv" in param:
+            # the model fuses q/k/v while checkpoints store them separately;
+            # collect the files holding all three pieces
+            piece_files = [
+                weight_map.get(param.replace("wqkv", piece))
+                for piece in ("wq", "wk", "wv")
+            ]
+            if all(piece_files):
+                needed_files.update(piece_files)
+                continue
         file = weight_map.get(param)
         if file:
             needed_files.add(file)
@@ -254,6 +272,26 @@ def load_safetensor_file(full_path: str, device: torch.device) -> Dict[str, torc
     return tensors
 
 
+def get_layer_id_offset(model_config: Optional[Dict]) -> int:
+    """Offset of this pipeline stage's first layer in the original model.
+
+    The model stores its layers locally indexed from 0, while checkpoints
+    (and HF weight maps) key layers by their ID in the original model.
+    """
+    if model_config is None or model_config.n_stages <= 1:
+        return 0
+    layers_per_stage = model_config.n_layers // model_config.n_stages
+    return layers_per_stage * model_config.stage_idx
+
+
+def to_original_layer_fqn(param: str, layer_id_offset: int) -> str:
+    """Translate a stage-local 'layers.<i>.' fqn to original-model layer IDs."""
+    if layer_id_offset and param.startswith("layers."):
+        local_id, _, rest = param[len("layers.") :].partition(".")
+        return f"layers.{int(local_id) + layer_id_offset}.{rest}"
+    return param
+
+
 def permute_weight_to_attn_heads(w, n_heads, head_dim, model_dim):
     """Permute the weight tensor to match the attention heads."""
     # TODO - this is borrowed from chat/convert_hf...we should expose this as a direct function
@@ -271,6 +309,7 @@ def update_state_dict(
     model_config: Optional[Dict] = None,
     new_to_old_keymap: Optional[Dict[str, str]] = None,
     updated_states: Optional[Set[str]]= None,
+    pending_qkv: Optional[Dict[str, Dict[str, torch.Tensor]]] = None,
 ):
     """
     Update the state dict with the checkpoint tensors.
@@ -286,33 +325,91 @@ def update_state_dict(
     num_local_heads = model_config.n_local_heads
     head_dim = model_config.head_dim
 
+    layer_id_offset = get_layer_id_offset(model_config)
+
+    def resolve_old_param(param):
+        param = to_original_layer_fqn(param, layer_id_offset)
+        if new_to_old_keymap is None:
+            return param
+        # TODO: clean the following manual prefix together with
+        # `purge_fqn_prefix` when we switch from creating Transformer to
+        # creating model
+        model_param = (
+            "output.weight" if param == "output.weight" else f"model.{param}"
+        )
+        return new_to_old_keymap[model_param]
+
     for param in state_dict.keys():
-        if new_to_old_keymap is not None:
-            # TODO: clean the following manual prefix together with
-            # `purge_fqn_prefix` when we switch from creating Transformer to
-            # creating model
-            model_param = (
-                "output.weight" if param == "output.weight" else f"model.{param}"
-            )
-            old_param = new_to_old_keymap[model_param]
+        if (
+            "wqkv" in param
+            and new_to_old_keymap is None
+            and to_original_layer_fqn(param, layer_id_offset) in checkpoint
+        ):
+            # torchchat-format checkpoints are fused (and permuted) at
+            # conversion time already
+            checkpoint_tensor = checkpoint[to_original_layer_fqn(param, layer_id_offset)]
+            model_tensor = state_dict[param]
+        elif "wqkv" in param:
+            # The model fuses q/k/v into a single projection while checkpoints
+            # store the pieces separately: gather all three, permute q/k to
+            # attn-head layout and concatenate. Pieces found in earlier
+            # checkpoint files are staged in pending_qkv, since a shard
+            # boundary may legally fall between a layer's q/k/v tensors.
+            pieces = pending_qkv.setdefault(param, {}) if pending_qkv is not None else {}
+            for piece_name, piece_heads in (
+                ("wq", num_heads),
+                ("wk", num_local_heads),
+                ("wv", None),
+            ):
+                if piece_name in pieces:
+                    continue
+                old_param = resolve_old_param(param.replace("wqkv", piece_name))
+                if old_param not in checkpoint:
+                    continue
+                piece = checkpoint[old_param]
+                if piece_heads is not None:
+                    piece = permute_weight_to_attn_heads(
+                        piece, piece_heads, head_dim, dim
+                    )
+                pieces[piece_name] = piece
+            if len(pieces) != 3:
+                # The remaining pieces are in other files
+                continue
+            checkpoint_tensor = torch.cat([pieces["wq"], pieces["wk"], pieces["wv"]])
+            if pending_qkv is not None:
+                del pending_qkv[param]
+            model_tensor = state_dict[param]
         else:
-            old_param = param
-
-        if old_param not in checkpoint:
-            # Maybe this param is in other files
-            continue
-
-        checkpoint_tensor = checkpoint[old_param]
-        model_tensor = state_dict[param]
-
-        if "wq" in param:
-            checkpoint_tensor = permute_weight_to_attn_heads(
-                checkpoint_tensor, num_heads, head_dim, dim
-            )
-        elif "wk" in param:
-            checkpoint_tensor = permute_weight_to_attn_heads(
-                checkpoint_tensor, num_local_heads, head_dim, dim
-            )
+            old_param = resolve_old_param(param)
+
+            if old_param not in checkpoint:
+                # Maybe this param is in other files
+                continue
+
+            checkpoint_tensor = checkpoint[old_param]
+            model_tensor = state_dict[param]
+
+            if "wq" in param:
+                checkpoint_tensor = permute_weight_to_attn_heads(
+                    checkpoint_tensor, num_heads, head_dim, dim
+                )
+            elif "wk" in param:
+                checkpoint_tensor = permute_weight_to_attn_heads(
+                    checkpoint_tensor, num_local_heads, head_dim, dim
+                )
+
+        if "wqkv" in param and isinstance(model_tensor, DTensor):
+            # TP shards the fused projection in contiguous row chunks;
+            # interleave the q/k/v blocks so each rank's chunk is its own
+            # [q, k, v] slice (matching Attention.forward's local split).
+            tp_degree = model_tensor.device_mesh.size()
+            if tp_degree > 1:
+                checkpoint_tensor = interleave_qkv_for_tp(
+                    checkpoint_tensor,
+                    num_heads * head_dim,
+                    num_local_heads * head_dim,
+                    tp_degree,
+                )
 
         # Move checkpoint tensor to desired device
         checkpoint_tensor = checkpoint_tensor.to(device)
@@ -67,9 +67,7 @@ def apply_tp(
     # Apply tensor parallelism to every transformer block
     for transformer_block in model.layers:
         layer_plan = {
-            "attention.wq": ColwiseParallel(),
-            "attention.wk": ColwiseParallel(),
-            "attention.wv": ColwiseParallel(),
+            "attention.wqkv": ColwiseParallel(),
             "attention.wo": RowwiseParallel(),
             "feed_forward.w1": ColwiseParallel(),
             "feed_forward.w2": RowwiseParallel(),
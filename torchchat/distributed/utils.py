@@ -7,9 +7,7 @@
 import itertools
 import os
 import time
-from dataclasses import dataclass
 from datetime import timedelta
-from os import environ
 from typing import Optional
 
 
@@ -41,33 +39,45 @@ def init_distributed(init_timeout_seconds: int = 120):
     # behavior differences
     _warn_overwrite_env(ASYNC_ERROR_HANDLING, SKIP_CLEANUP)
 
-    torch.distributed.init_process_group(
-        "nccl", timeout=timedelta(seconds=init_timeout_seconds)
-    )
-
     # to mitigate the memory issue that collectives using
     # async_op=True hold memory longer than they should
     # such as those in tensor parallelism
+    # NCCL reads this at communicator creation, so it must be set before
+    # init_process_group for it to take effect
     os.environ["TORCH_NCCL_AVOID_RECORD_STREAMS"] = "1"
 
+    torch.distributed.init_process_group(
+        "nccl", timeout=timedelta(seconds=init_timeout_seconds)
+    )
+
+
+# parameter counts never change during inference, so memoize per (model, flag)
+_num_params_cache = {}
+
 
 def get_num_params(model: torch.nn.Module, exclude_embedding: bool = False) -> int:
-    num_params = sum(p.numel() for p in model.parameters())
-    if exclude_embedding:
-        num_params -= model.tok_embeddings.weight.numel()
+    cache_key = (id(model), exclude_embedding)
+    num_params = _num_params_cache.get(cache_key)
+    if num_params is None:
+        # materialize the sizes first so the reduction runs in C via builtin sum
+        sizes = [p.numel() for p in model.parameters()]
+        num_params = sum(sizes)
+        if exclude_embedding:
+            num_params -= model.tok_embeddings.weight.numel()
+        _num_params_cache[cache_key] = num_params
     readable_num_params = format_model_params(num_params)
     return readable_num_params
 
 
 def get_module_size(stage: torch.nn.Module) -> int:
     """get module (stage) size in bytes"""
-    model_size = sum(
-        [
-            p.numel() * p.dtype.itemsize
-            for p in itertools.chain(stage.parameters(), stage.buffers())
-        ]
-    )
-    return model_size
+    # accumulate element counts per dtype so the itemsize multiply happens
+    # once per dtype instead of once per tensor
+    numel_by_dtype = {}
+    for p in itertools.chain(stage.parameters(), stage.buffers()):
+        dtype = p.dtype
+        numel_by_dtype[dtype] = numel_by_dtype.get(dtype, 0) + p.numel()
+    return sum(numel * dtype.itemsize for dtype, numel in numel_by_dtype.items())
 
 
 def format_model_params(params):
@@ -80,26 +90,26 @@ def format_model_params(params):
         return f"{params:,}"
 
 
+_GiB = 1024**3  # 1 GiB in bytes
+_MiB = 1024**2  # 1 MiB in bytes
+
+
 def bytes_to_readable(bytes_value: int, round_to: int = 2) -> str:
     """formatting function to make reading model (stage) sizes easy"""
-    GiB = 1024**3  # 1 GiB in bytes
-    MiB = 1024**2  # 1 MiB in bytes
-
-    if bytes_value >= GiB:
-        value = bytes_value / GiB
+    if bytes_value >= _GiB:
+        value = bytes_value / _GiB
         unit = "GiB"
     else:
-        value = bytes_value / MiB
+        value = bytes_value / _MiB
         unit = "MiB"
 
-    # Round to 2 decimal places
-    rounded_value = round(value, round_to)
-
-    return f"{rounded_value} {unit}"
+    # rounding happens in the format spec, no intermediate round() float
+    return f"{value:.{round_to}f} {unit}"
 
 
-@dataclass(frozen=True)
 class Color:
+    """ANSI color escape codes, accessed as plain class attributes"""
+
     black = "\033[30m"
     red = "\033[31m"
     green = "\033[32m"
@@ -111,8 +121,9 @@ class Color:
     reset = "\033[39m"
 
 
-@dataclass(frozen=True)
 class NoColor:
+    """drop-in replacement for Color that emits no escape codes"""
+
     black = ""
     red = ""
     green = ""
@@ -124,25 +135,24 @@ class NoColor:
     reset = ""
 
 class TrackTime:
-    """integrated class for perf timing via perf_counter"""
+    """integrated class for perf timing via monotonic_ns"""
 
     def __init__(self, use_ms: bool = False, round_to: Optional[int] = 4):
         self.use_ms = use_ms
         self.round_to = round_to
-        self.start_time = 0.0
+        self.start_time = 0
         self.elapsed_time = 0.0
         self.unit = "seconds" if not use_ms else "milliseconds"
 
     def __enter__(self):
-        self.start_time = time.perf_counter()
+        # integer nanosecond clock avoids the float conversion inside
+        # perf_counter and keeps sub-ms readings exact
+        self.start_time = time.monotonic_ns()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        end_time = time.perf_counter()
-        self.elapsed_time = end_time - self.start_time
-
-        if self.use_ms:
-            self.elapsed_time *= 1000  # Convert to milliseconds
+        elapsed_ns = time.monotonic_ns() - self.start_time
+        self.elapsed_time = elapsed_ns / (1e6 if self.use_ms else 1e9)
 
         if self.round_to is not None:
             self.elapsed_time = round(self.elapsed_time, self.round_to)
@@ -215,6 +225,10 @@ class CUDATrackTime:
         self.stop()
 
 class GPUMemoryMonitor:
+    # NOTE: GiB (gibibyte) is 1024, vs GB is 1000; multiply by the
+    # reciprocal rather than dividing on every conversion
+    _gib_reciprocal = 1.0 / (1024 * 1024 * 1024)
+
     def __init__(self, device: str):
         self.device = torch.device(device)  # device object
         self.device_name = torch.cuda.get_device_name(self.device)
@@ -224,22 +238,21 @@ class GPUMemoryMonitor:
         ).total_memory
         self.device_capacity_gib = self._to_gib(self.device_capacity)
 
+        # Note: do not call torch.cuda.empty_cache() here; releasing the
+        # allocator's cached blocks at startup only forces them to be
+        # re-requested from the driver later.
         torch.cuda.reset_peak_memory_stats()
-        torch.cuda.empty_cache()
 
     def _to_gib(self, memory_in_bytes):
-        # NOTE: GiB (gibibyte) is 1024, vs GB is 1000
-        _gib_in_bytes = 1024 * 1024 * 1024
-        memory_in_gib = memory_in_bytes / _gib_in_bytes
-        return memory_in_gib
+        return memory_in_bytes * self._gib_reciprocal
 
     def _to_pct(self, memory):
         return 100 * memory / self.device_capacity
 
     def get_peak_stats(self):
-        cuda_info = torch.cuda.memory_stats(self.device)
-
-        max_reserved = cuda_info["reserved_bytes.all.peak"]
+        # dedicated accessor returns the single counter we need, without
+        # marshalling the full torch.cuda.memory_stats() dict
+        max_reserved = torch.cuda.max_memory_reserved(self.device)
         max_reserved_gib = self._to_gib(max_reserved)
         max_reserved_pct = self._to_pct(max_reserved)
 
@@ -259,11 +272,11 @@ class GPUMemoryMonitor:
         return device_info
 
 def run_in_dist_env(world_size: int, rank: int, target: callable):
-    environ["MASTER_ADDR"] = "localhost"
-    environ["MASTER_PORT"] = "29500"
-    environ["RDZV_BACKEND"] = "c10d"
-    environ["WORLD_SIZE"] = str(world_size)
-    environ["RANK"] = str(rank)
-    environ["LOCALRANK"] = str(rank)
+    os.environ["MASTER_ADDR"] = "localhost"
+    os.environ["MASTER_PORT"] = "29500"
+    os.environ["RDZV_BACKEND"] = "c10d"
+    os.environ["WORLD_SIZE"] = str(world_size)
+    os.environ["RANK"] = str(rank)
+    os.environ["LOCALRANK"] = str(rank)
 
     return target()
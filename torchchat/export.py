@@ -192,9 +192,7 @@ try:
         def __init__(self, attention: Attention):
             super().__init__()
 
-            self.wq = attention.wq
-            self.wk = attention.wk
-            self.wv = attention.wv
+            self.wqkv = attention.wqkv
 
             self.wo = attention.wo
 
@@ -220,12 +218,14 @@ try:
             self.n_local_heads = attention.n_local_heads
             self.dim = attention.dim
 
-        def forward(self, x, freqs_cis, mask, input_pos=None, cache_lane: int = 0):
+        def forward(
+            self, x, freqs_cis, mask, input_pos=None, start=None, cache_lane: int = 0
+        ):
             bsz, seqlen, _ = x.shape
 
-            q = self.wq(x)
-            k = self.wk(x)
-            v = self.wv(x)
+            q_size = self.n_heads * self.head_dim
+            kv_size = self.n_local_heads * self.head_dim
+            q, k, v = self.wqkv(x).split([q_size, kv_size, kv_size], dim=-1)
 
             q = q.view(bsz, seqlen, self.n_heads, self.head_dim)
             k = k.view(bsz, seqlen, self.n_local_heads, self.head_dim)
@@ -247,7 +247,7 @@ try:
                 input_pos[-1].item(),
                 seqlen,
             )
-            output = output.view(bsz, seqlen, self.dim).to(dtype=x.dtype)
+            output = output.view(bsz, seqlen, self.n_heads * self.head_dim).to(dtype=x.dtype)
             return self.wo(output)
 
     def replace_attention_with_custom_sdpa_attention(module: nn.Module):
@@ -3,6 +3,7 @@
 
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
+import functools
 import json
 import logging
 import os
@@ -44,13 +45,20 @@ config_path = Path(f"{str(Path(__file__).parent)}/model_params")
 logger = logging.getLogger(__name__)
 
 
+@torch.compile(fullgraph=True, dynamic=True)
+def _quick_gelu(input: Tensor) -> Tensor:
+    # compiled so the mul/sigmoid/mul chain runs as one fused kernel instead
+    # of three full activation read/writes (compilation happens on first call)
+    return input * torch.sigmoid(1.702 * input)
+
+
 class QuickGELUActivation(nn.Module):
     """
     Applies GELU approximation that is fast but somewhat inaccurate. See: https://github.com/hendrycks/GELUs
     """
 
     def forward(self, input):
-        return input * torch.sigmoid(1.702 * input)
+        return _quick_gelu(input)
 
 
 def identity(**kwargs):
@@ -101,6 +109,12 @@ class ConcateFusion(nn.Module):
             act=mm_proj_activation,
         )
 
+        # reusable position range so forward never allocates an arange;
+        # sliced as a zero-copy view and grown lazily if ever exceeded
+        self.register_buffer(
+            "_pos_arange", torch.arange(8192, dtype=torch.int), persistent=False
+        )
+
     def forward(
         self,
         tokens: Tensor,
@@ -122,11 +136,12 @@ class ConcateFusion(nn.Module):
         )
 
         if input_pos is None:
-            input_pos = torch.arange(
-                decoder_input.shape[1],
-                device=decoder_input.device,
-                dtype=torch.int,
-            )
+            seqlen = decoder_input.shape[1]
+            if seqlen > self._pos_arange.shape[0]:
+                self._pos_arange = torch.arange(
+                    seqlen, device=self._pos_arange.device, dtype=torch.int
+                )
+            input_pos = self._pos_arange[:seqlen]
 
         return self.decoder(decoder_input, input_pos=input_pos)
 
@@ -134,12 +149,9 @@ class ConcateFusion(nn.Module):
         self.decoder.setup_caches(batch_size, max_seq_len)
 
     def _encoder_feature_select(self, encoder_output) -> Tensor:
-        selected_image_feature = encoder_output[1][0].view(
-            *encoder_output[1][0].shape[2:]
-        )
-
-        selected_image_feature = selected_image_feature[:, 1:]
-        return selected_image_feature
+        selected_image_feature = encoder_output[1][0]
+        # collapse the two leading singleton dims, then drop the CLS token
+        return selected_image_feature.reshape(*selected_image_feature.shape[2:])[:, 1:]
 
     def _get_decoder_input(
         self,
@@ -152,12 +164,18 @@ class ConcateFusion(nn.Module):
             assert post_tokens is None
             return self.tok_embeddings(tokens)
         else:
-            pre_img_embed = self.tok_embeddings(tokens)
             image_embeds = self.mm_projector(encoder_output)
             if post_tokens is None:
+                pre_img_embed = self.tok_embeddings(tokens)
                 return torch.cat((pre_img_embed, image_embeds), dim=1)
 
-            post_img_embed = self.tok_embeddings(post_tokens)
+            # embed pre- and post-image tokens with a single gather
+            combined_embed = self.tok_embeddings(
+                torch.cat((tokens, post_tokens), dim=-1)
+            )
+            pre_img_embed, post_img_embed = combined_embed.split(
+                [tokens.shape[-1], post_tokens.shape[-1]], dim=1
+            )
             return torch.cat((pre_img_embed, image_embeds, post_img_embed), dim=1)
 
 
@@ -244,17 +262,18 @@ class ModelRecipe:
 
     @classmethod
     def get_recipe(cls, model_type):
-        match model_type:
-            case ModelType.TextOnly:
-                return cls._text_only()
-            case ModelType.Flamingo:
-                return cls._flamingo()
-            case ModelType.Llama3_1:
-                return cls._llama3_1()
-            case ModelType.Llava:
-                return cls._llava()
-            case _:
-                raise ValueError(f"Can not find the model recipe for {model_type}")
+        recipe_factory = MODEL_TYPE_TO_RECIPE.get(model_type)
+        if recipe_factory is None:
+            raise ValueError(f"Can not find the model recipe for {model_type}")
+        return recipe_factory()
+
+
+MODEL_TYPE_TO_RECIPE = {
+    ModelType.TextOnly: ModelRecipe._text_only,
+    ModelType.Flamingo: ModelRecipe._flamingo,
+    ModelType.Llama3_1: ModelRecipe._llama3_1,
+    ModelType.Llava: ModelRecipe._llava,
+}
 
 
 @dataclass
@@ -268,7 +287,9 @@ class TransformerArgs:
     # hidden dim is intermediate_size in gpt-fast
     hidden_dim: int = None
     n_local_heads: int = -1
-    head_dim: int = 64
+    # None derives dim // n_heads; set explicitly for archs whose head_dim
+    # differs (e.g. some MQA/GQA variants) so KV caches aren't mis-sized
+    head_dim: Optional[int] = None
     rope_base: float = 10000
     norm_eps: float = 1e-5
     multiple_of: int = 256
@@ -287,6 +308,13 @@ class TransformerArgs:
     feed_forward_bias: bool = False
     # Whether or not to tie the input word embeddings to the output
     tie_word_embeddings: bool = False
+    # KV cache storage dtype; None uses get_precision(). Accepts a
+    # torch.dtype or its name (e.g. "float8_e4m3fn", "int8") from json
+    # params; quantized dtypes store per-cache scales alongside.
+    kv_cache_dtype: Optional[Union[str, torch.dtype]] = None
+    # Opt-in approximation: reuse the pre-attention RMS statistic for the
+    # mlp-side norm of the same block, skipping one reduction per block.
+    coupled_norm: bool = False
     # Granite architecture multipliers
     embedding_multiplier: Optional[float] = None
     attention_multiplier: Optional[float] = None
@@ -306,9 +334,13 @@ class TransformerArgs:
             if self.ffn_dim_multiplier is not None:
                 hidden_dim = int(self.ffn_dim_multiplier * hidden_dim)
             self.hidden_dim = find_multiple(hidden_dim, multiple_of)
-        self.head_dim = self.dim // self.n_heads
+        if self.head_dim is None:
+            assert self.dim % self.n_heads == 0
+            self.head_dim = self.dim // self.n_heads
         if isinstance(self.use_tiktoken, str):
             self.use_tiktoken = self.use_tiktoken == "True"
+        if isinstance(self.kv_cache_dtype, str):
+            self.kv_cache_dtype = getattr(torch, self.kv_cache_dtype)
 
     @classmethod
     def from_params(cls, params):
@@ -319,6 +351,41 @@ class TransformerArgs:
         return cls(**params)
 
 
+@functools.lru_cache(maxsize=1)
+def _known_model_params():
+    """Known model config names, listed from disk once per process."""
+    return [config.replace(".json", "") for config in os.listdir(config_path)]
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_model_config_path(name: str) -> Path:
+    """Fuzzy-match a model directory name to its config json (cached)."""
+    known_model_params = _known_model_params()
+
+    print(f"known configs: {known_model_params}")
+    # Fuzzy search by name (e.g. "7B" and "Mistral-7B")
+    config = [
+        config
+        for config in known_model_params
+        if config.upper() in name.upper() or config in name
+    ]
+
+    # We may have two or more configs matched (e.g., "7B" and
+    # "Mistral-7B"). Find the best config match:  take longer
+    # name (as it have more symbols matched)
+    if len(config) > 1:
+        config.sort(key=len, reverse=True)
+        assert len(config[0]) != len(
+            config[1]
+        ), name  # make sure only one 'best' match
+    elif len(config) == 0:
+        raise ValueError(
+            f"Unknown model directory name {name}. Must be one of {known_model_params}."
+        )
+
+    return config_path / f"{config[0]}.json"
+
+
 @dataclass
 class ModelArgs:
     """
@@ -400,11 +467,8 @@ class ModelArgs:
         if json_path.is_file():
             return ModelArgs.from_params(json_path)
         else:
-            known_model_params = [
-                config.replace(".json", "") for config in os.listdir(config_path)
-            ]
             raise RuntimeError(
-                f"unknown table index {name} for transformer config, must be from {known_model_params}"
+                f"unknown table index {name} for transformer config, must be from {_known_model_params()}"
             )
 
     @classmethod
@@ -413,32 +477,89 @@ class ModelArgs:
         if Path(json_path).is_file():
             return ModelArgs.from_params(json_path)
 
-        known_model_params = [
-            config.replace(".json", "") for config in os.listdir(config_path)
-        ]
+        # Re-parse the config each hit so callers get independent (mutable)
+        # ModelArgs instances; only the name resolution is cached.
+        return ModelArgs.from_params(_resolve_model_config_path(str(name)))
+
+
+@functools.lru_cache(maxsize=8)
+def _shared_freqs_cis(head_dim, seq_len, rope_base, dtype, rope_scaling_items, device):
+    """One freqs_cis table per (config, device), shared across Transformers."""
+    rope_scaling = dict(rope_scaling_items) if rope_scaling_items is not None else None
+    return precompute_freqs_cis(
+        head_dim, seq_len, rope_base, dtype=dtype, rope_scaling=rope_scaling, device=device
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _shared_causal_mask(max_seq_length, dtype, device):
+    """One additive causal mask per (length, dtype, device), shared across
+    Transformers (e.g. multiple pipeline stages in one process)."""
+    return torch.full(
+        (max_seq_length, max_seq_length), float("-inf"), dtype=dtype, device=device
+    ).triu_(1)
+
+
+def _add_rms_norm_math(residual, delta, multiplier, normalized_shape, weight, eps):
+    h = residual + delta * multiplier
+    return h, F.rms_norm(h, normalized_shape, weight, eps)
+
+
+_add_rms_norm_fused = torch.compile(
+    _add_rms_norm_math, mode="reduce-overhead", fullgraph=True
+)
 
-        print(f"known configs: {known_model_params}")
-        # Fuzzy search by name (e.g. "7B" and "Mistral-7B")
-        config = [
-            config
-            for config in known_model_params
-            if config.upper() in str(name).upper() or config in str(name)
-        ]
 
-        # We may have two or more configs matched (e.g., "7B" and
-        # "Mistral-7B"). Find the best config match:  take longer
-        # name (as it have more symbols matched)
-        if len(config) > 1:
-            config.sort(key=len, reverse=True)
-            assert len(config[0]) != len(
-                config[1]
-            ), name  # make sure only one 'best' match
-        elif len(config) == 0:
-            raise ValueError(
-                f"Unknown model directory name {name}. Must be one of {known_model_params}."
+def add_rms_norm(residual, delta, multiplier, norm: nn.RMSNorm):
+    """Residual add fused with the following RMSNorm (AddRmsNorm).
+
+    nn.RMSNorm itself already runs as one fused aten kernel; folding the
+    preceding residual add (and granite residual multiplier) in as well
+    saves two more activation-sized read/write passes per block.
+    Returns (residual_out, normed_out).
+    """
+    if torch.compiler.is_compiling():
+        return _add_rms_norm_math(
+            residual, delta, multiplier, norm.normalized_shape, norm.weight, norm.eps
+        )
+    return _add_rms_norm_fused(
+        residual, delta, multiplier, norm.normalized_shape, norm.weight, norm.eps
+    )
+
+
+def interleave_qkv_for_tp(
+    wqkv: Tensor, q_size: int, kv_size: int, tp_degree: int
+) -> Tensor:
+    """Reorder fused-QKV rows for tensor-parallel sharding.
+
+    ColwiseParallel gives each rank a contiguous 1/tp_degree slice of rows;
+    reorder them to [q_0, k_0, v_0, q_1, k_1, v_1, ...] so that slice holds
+    exactly rank r's q/k/v blocks and forward can split by local sizes.
+    """
+    q, k, v = wqkv.split([q_size, kv_size, kv_size], dim=0)
+    q_r, kv_r = q_size // tp_degree, kv_size // tp_degree
+    return torch.cat(
+        [
+            piece
+            for r in range(tp_degree)
+            for piece in (
+                q[r * q_r : (r + 1) * q_r],
+                k[r * kv_r : (r + 1) * kv_r],
+                v[r * kv_r : (r + 1) * kv_r],
             )
+        ]
+    )
+
+
+# KV cache dtypes that store quantized values plus per-position scales,
+# mapped to the largest magnitude the dtype can represent
+_QUANTIZED_KV_DTYPES = {
+    torch.float8_e4m3fn: 448.0,
+    torch.int8: 127.0,
+}
 
-        return ModelArgs.from_params(config_path / f"{config[0]}.json")
+# SDPA handles grouped-query attention natively from torch 2.5 on
+_SDPA_SUPPORTS_GQA = tuple(int(v) for v in torch.__version__.split(".")[:2]) >= (2, 5)
 
 
 class KVCache(nn.Module):
@@ -451,20 +572,60 @@ class KVCache(nn.Module):
         dtype=None,
     ):
         super().__init__()
-        # print(f"dtype on entry {dtype}")
         if not dtype:
             dtype = get_precision()
-        # print(f"dtype on get_prec {dtype}")
+        self.quantized = dtype in _QUANTIZED_KV_DTYPES
         cache_shape = (max_batch_size, n_heads, max_seq_length, head_dim)
         self.register_buffer("k_cache", torch.zeros(cache_shape, dtype=dtype))
         self.register_buffer("v_cache", torch.zeros(cache_shape, dtype=dtype))
-
-    def update(self, input_pos, k_val, v_val):
-        # input_pos: [S], k_val: [B, H, S, D]
-        assert input_pos.shape[0] == k_val.shape[2]
+        if self.quantized:
+            # dynamic per-position scales, written alongside every cache
+            # update -- nothing needs offline calibration
+            self.qmax = _QUANTIZED_KV_DTYPES[dtype]
+            scale_shape = (max_batch_size, n_heads, max_seq_length, 1)
+            self.register_buffer("k_scale", torch.ones(scale_shape), persistent=False)
+            self.register_buffer("v_scale", torch.ones(scale_shape), persistent=False)
+
+    def quantize(self, val):
+        # per-position scale from the head_dim amax; the clamp keeps all-zero
+        # rows representable
+        scale = val.abs().amax(dim=-1, keepdim=True).float().clamp(min=1e-6) / self.qmax
+        q = val / scale
+        if self.k_cache.dtype == torch.int8:
+            q = q.round()
+        return q.to(self.k_cache.dtype), scale
+
+    def dequantize(self, cache_val, scale, dtype):
+        return (cache_val.float() * scale).to(dtype)
+
+    def update(self, input_pos, k_val, v_val, start: Optional[int] = None):
+        # input_pos: [S], k_val: [B, H, S, D]. `start` is input_pos[0] as a
+        # Python int, supplied by the caller when the positions are known to
+        # be a contiguous range -- Transformer.forward reads it from the
+        # device once per step, so no per-layer sync happens here.
+        seqlen = input_pos.shape[0]
+        assert seqlen == k_val.shape[2]
+
+        if self.quantized:
+            k_val, k_scales = self.quantize(k_val)
+            v_val, v_scales = self.quantize(v_val)
+
+        # A strided slice copy avoids index_put_'s index materialization and
+        # scatter; under compile/graph capture the tensor-indexed write below
+        # captures cleanly instead.
+        if start is not None and not torch.compiler.is_compiling():
+            self.k_cache[:, :, start : start + seqlen].copy_(k_val)
+            self.v_cache[:, :, start : start + seqlen].copy_(v_val)
+            if self.quantized:
+                self.k_scale[:, :, start : start + seqlen].copy_(k_scales)
+                self.v_scale[:, :, start : start + seqlen].copy_(v_scales)
+            return self.k_cache, self.v_cache
 
         k_out = torch.ops.aten.index_put_(self.k_cache, [None, None, input_pos], k_val)
         v_out = torch.ops.aten.index_put_(self.v_cache, [None, None, input_pos], v_val)
+        if self.quantized:
+            torch.ops.aten.index_put_(self.k_scale, [None, None, input_pos], k_scales)
+            torch.ops.aten.index_put_(self.v_scale, [None, None, input_pos], v_scales)
 
         return k_out, v_out
 
@@ -665,14 +826,14 @@ class Transformer(nn.Module):
             else None
         )
 
-        # Use ModuleDict so that each layer can be assigned its layer ID in the original model
-        self.layers = nn.ModuleDict()
-
-        for layer_id in range(
-            layers_per_stage * config.stage_idx,
-            layers_per_stage * (config.stage_idx + 1),
-        ):
-            self.layers[str(layer_id)] = TransformerBlock(config)
+        # Layers are indexed locally from 0; layer_id_offset maps a local
+        # index back to the layer's ID in the original model (non-zero only
+        # for pipeline stages past the first). load_hook rewrites checkpoint
+        # keys carrying original IDs accordingly.
+        self.layer_id_offset = layers_per_stage * config.stage_idx
+        self.layers = nn.ModuleList(
+            TransformerBlock(config) for _ in range(layers_per_stage)
+        )
 
         if config.stage_idx == config.n_stages - 1:
             self.norm = nn.RMSNorm(config.dim, eps=config.norm_eps)
@@ -685,15 +846,30 @@ class Transformer(nn.Module):
 
         self.max_batch_size = -1
         self.max_seq_length = -1
+        self._blocks_compiled = False
         self._register_load_state_dict_pre_hook(self.load_hook)
 
     def load_hook(self, state_dict, prefix, *args):
-        """Handle tied embeddings at load time"""
+        """Handle tied embeddings and original-model layer IDs at load time"""
         if self.config.tie_word_embeddings:
             state_dict.setdefault(
                 "model.output.weight", state_dict["model.tok_embeddings.weight"]
             )
 
+        # Pipeline-stage checkpoints key layers by their ID in the original
+        # model; shift the IDs belonging to this stage down to local indices.
+        if self.layer_id_offset:
+            layers_prefix = f"{prefix}layers."
+            for key in list(state_dict):
+                if not key.startswith(layers_prefix):
+                    continue
+                layer_id, _, rest = key[len(layers_prefix) :].partition(".")
+                local_id = int(layer_id) - self.layer_id_offset
+                if 0 <= local_id < len(self.layers):
+                    state_dict[f"{layers_prefix}{local_id}.{rest}"] = state_dict.pop(
+                        key
+                    )
+
     def setup_caches(self, max_batch_size, max_seq_length, cache_lanes: int = 1):
         if (
             self.max_seq_length >= max_seq_length
@@ -703,7 +879,7 @@ class Transformer(nn.Module):
         max_seq_length = find_multiple(max_seq_length, 8)
         self.max_seq_length = max_seq_length
         self.max_batch_size = max_batch_size
-        for b in self.layers.values():
+        for b in self.layers:
             # Lower the setup_cache call to the attention module because tensor
             # parallelism may have been applied there and the `n_local_heads``
             # value being adjusted.
@@ -711,17 +887,48 @@ class Transformer(nn.Module):
                 max_batch_size, max_seq_length, cache_lanes=cache_lanes
             )
 
-        freqs_cis = precompute_freqs_cis(
-            self.config.dim // self.config.n_heads,
-            self.config.block_size * 2,
-            self.config.rope_base,
-            rope_scaling=self.config.rope_scaling,
-        )
-        self.register_buffer("freqs_cis", freqs_cis, persistent=True)
-        causal_mask = torch.tril(
-            torch.ones(self.max_seq_length, self.max_seq_length, dtype=torch.bool)
-        )
-        self.register_buffer("causal_mask", causal_mask, persistent=True)
+        # cache-only tensors: rebuilt by setup_caches, never checkpointed.
+        # freqs_cis depends only on config, so it survives cache regrowth;
+        # causal_mask is rebuilt only when max_seq_length actually changes.
+        # Both come from process-wide caches, so Transformers with identical
+        # config (e.g. pipeline stages) share one table per device. The
+        # ambient factory device is honored, as with the factory calls before.
+        device = torch.empty(0).device
+        if getattr(self, "freqs_cis", None) is None:
+            rope_scaling = self.config.rope_scaling
+            freqs_cis = _shared_freqs_cis(
+                self.config.head_dim,
+                self.config.block_size * 2,
+                self.config.rope_base,
+                get_precision(),
+                tuple(sorted(rope_scaling.items())) if rope_scaling else None,
+                device,
+            )
+            self.register_buffer("freqs_cis", freqs_cis, persistent=False)
+        causal_mask = getattr(self, "causal_mask", None)
+        if causal_mask is None or causal_mask.size(0) != max_seq_length:
+            # Additive mask in the activation dtype (0 keep / -inf drop): SDPA
+            # consumes it directly, with no bool->float conversion per step.
+            causal_mask = _shared_causal_mask(
+                max_seq_length, get_precision(), device
+            )
+            self.register_buffer("causal_mask", causal_mask, persistent=False)
+
+    def compile_for_decode(self):
+        """Opt-in: compile every TransformerBlock for the decode hot loop.
+
+        Each block is small-batch memory-bound and dominated by kernel launch
+        overhead; compiling per block fuses norm/matmul/elementwise chains
+        while keeping the outer generation loop in eager Python. forward()
+        then sticks to the tensor-indexed mask/position path (no Python-int
+        fast paths), so the captured graphs stay stable across steps and
+        KVCache.update takes its capture-safe branch.
+        """
+        self._blocks_compiled = True
+        for layer in self.layers:
+            layer.forward = torch.compile(
+                layer.forward, mode="reduce-overhead", fullgraph=True, dynamic=False
+            )
 
     def distribute(self, device_mesh: DeviceMesh):
         if self.tok_embeddings:
@@ -731,7 +938,7 @@ class Transformer(nn.Module):
                 RowwiseParallel(input_layouts=Replicate()),
             )
 
-        for layer in self.layers.values():
+        for layer in self.layers:
             layer.distribute(device_mesh)
 
         if self.output:
@@ -745,8 +952,38 @@ class Transformer(nn.Module):
         self, x: Tensor, input_pos: Optional[Tensor] = None, cache_lane: int = 0
     ) -> Tensor:
         assert self.freqs_cis is not None, "Caches must be initialized first"
-        mask = self.causal_mask[None, None, input_pos]
-        freqs_cis = self.freqs_cis[input_pos]
+        # Under compile the tensor gather captures cleanly, while the item()
+        # reads of the eager fast paths below would graph-break.
+        # getattr: snapshots serialized before this attribute existed
+        tensor_only = torch.compiler.is_compiling() or getattr(
+            self, "_blocks_compiled", False
+        )
+        start = (
+            int(input_pos[0])
+            if input_pos is not None and not tensor_only
+            else None
+        )
+        if start is not None and input_pos.numel() == 1:
+            # Decode step (eager): no mask tensor at all -- Attention clips
+            # itself to the filled cache prefix, which is fully visible to
+            # the single query position. freqs_cis is a zero-alloc view.
+            mask = None
+            freqs_cis = self.freqs_cis[start : start + 1]
+        elif start == 0 and int(input_pos[-1]) == input_pos.numel() - 1:
+            # Prefill from position 0 (eager): SDPA applies causality
+            # natively, with no S x S mask read.
+            mask = None
+            freqs_cis = self.freqs_cis[: input_pos.numel()]
+        else:
+            mask = self.causal_mask[None, None, input_pos]
+            freqs_cis = self.freqs_cis[input_pos]
+            if start is not None and (
+                int(input_pos[-1]) - start != input_pos.numel() - 1
+            ):
+                # non-contiguous positions: no slice fast path downstream
+                start = None
+        # pre-broadcast once for the q and k rotary applications in every layer
+        freqs_cis = freqs_cis[None, :, None]
         if self.tok_embeddings:
             x = self.tok_embeddings(x)
 
@@ -754,8 +991,10 @@ class Transformer(nn.Module):
             if self.config.embedding_multiplier:
                 x = x * self.config.embedding_multiplier
 
-        for _, layer in self.layers.items():
-            x = layer(x, input_pos, freqs_cis, mask, cache_lane=cache_lane)
+        for layer in self.layers:
+            x = layer(
+                x, input_pos, freqs_cis, mask, start=start, cache_lane=cache_lane
+            )
 
         if self.norm:
             x = self.norm(x)
@@ -764,7 +1003,6 @@ class Transformer(nn.Module):
         # For granite architectures
         if self.config.logits_scaling:
             x = x / self.config.logits_scaling
-        # print(f"output shape: {x.shape}")
         return x
 
 
@@ -775,6 +1013,7 @@ class TransformerBlock(nn.Module):
         self.feed_forward = FeedForward(config)
         self.ffn_norm = nn.RMSNorm(config.dim, config.norm_eps)
         self.attention_norm = nn.RMSNorm(config.dim, config.norm_eps)
+        self.coupled_norm = config.coupled_norm
         # None for llama architecture, set for granite architectures
         self.residual_multiplier = (
             config.residual_multiplier
@@ -792,52 +1031,65 @@ class TransformerBlock(nn.Module):
         input_pos: Tensor,
         freqs_cis: Tensor,
         mask: Tensor,
+        start: Optional[int] = None,
         cache_lane: int = 0,
     ) -> Tensor:
-        h = (
-            x
-            + self.attention(
+        if self.coupled_norm:
+            # Approximation: the pre-mlp RMS closely tracks the pre-attention
+            # RMS after the residual add, so compute the statistic once and
+            # reuse it for both norms of the block.
+            inv_rms = torch.rsqrt(
+                x.pow(2).mean(-1, keepdim=True) + self.attention_norm.eps
+            )
+            attn_out = self.attention(
+                x * inv_rms * self.attention_norm.weight,
+                freqs_cis,
+                mask,
+                input_pos,
+                start=start,
+                cache_lane=cache_lane,
+            )
+            h = x + attn_out * self.residual_multiplier
+            ffn_in = h * inv_rms * self.ffn_norm.weight
+        else:
+            attn_out = self.attention(
                 self.attention_norm(x),
                 freqs_cis,
                 mask,
                 input_pos,
+                start=start,
                 cache_lane=cache_lane,
             )
-            * self.residual_multiplier
-        )
-        out = h + self.feed_forward(self.ffn_norm(h)) * self.residual_multiplier
+            # residual add fused with the mlp-side norm
+            h, ffn_in = add_rms_norm(
+                x, attn_out, self.residual_multiplier, self.ffn_norm
+            )
+        out = h + self.feed_forward(ffn_in) * self.residual_multiplier
         return out
 
 
 class Attention(nn.Module):
     def __init__(self, config: TransformerArgs):
         super().__init__()
-        assert config.dim % config.n_heads == 0
 
-        # key, query, value projections for all heads, but in a batch
-        # total_head_dim = (config.n_heads + 2 * config.n_local_heads) * config.head_dim
-        # self.wqkv = nn.Linear(config.dim, total_head_dim, bias=config.attention_bias)
-        self.wq = nn.Linear(
-            config.dim, config.n_heads * config.head_dim, bias=config.attention_bias
-        )
-        self.wk = nn.Linear(
-            config.dim,
-            config.n_local_heads * config.head_dim,
-            bias=config.attention_bias,
-        )
-        self.wv = nn.Linear(
-            config.dim,
-            config.n_local_heads * config.head_dim,
-            bias=config.attention_bias,
-        )
+        # key, query, value projections for all heads, but in a batch:
+        # a single GEMM loads the fused weight once instead of reading the
+        # activations three times for separate wq/wk/wv projections
+        total_head_dim = (config.n_heads + 2 * config.n_local_heads) * config.head_dim
+        self.wqkv = nn.Linear(config.dim, total_head_dim, bias=config.attention_bias)
 
-        self.wo = nn.Linear(config.dim, config.dim, bias=config.attention_bias)
+        self.wo = nn.Linear(
+            config.n_heads * config.head_dim, config.dim, bias=config.attention_bias
+        )
         self.kv_cache = None
 
         self.n_heads = config.n_heads
         self.head_dim = config.head_dim
         self.n_local_heads = config.n_local_heads
         self.dim = config.dim
+        # GQA expansion factor, cached so forward does no per-step shape math
+        self.n_rep = config.n_heads // config.n_local_heads
+        self.kv_cache_dtype = config.kv_cache_dtype
         self.attention_scale = config.attention_multiplier
         self._register_load_state_dict_pre_hook(self.load_hook)
 
@@ -849,56 +1101,49 @@ class Attention(nn.Module):
 
         self.kv_cache = nn.ModuleList(
             [
-                KVCache(max_batch_size, max_seq_length, n_local_heads, self.head_dim)
+                KVCache(
+                    max_batch_size,
+                    max_seq_length,
+                    n_local_heads,
+                    self.head_dim,
+                    dtype=self.kv_cache_dtype,
+                )
                 for _ in range(cache_lanes)
             ]
         )
 
     def load_hook(self, state_dict, prefix, *args):
-        # if prefix + "wq.weight" in state_dict:
-        #     wq = state_dict.pop(prefix + "wq.weight")
-        #     wk = state_dict.pop(prefix + "wk.weight")
-        #     wv = state_dict.pop(prefix + "wv.weight")
-        #     state_dict[prefix + "wqkv.weight"] = torch.cat([wq, wk, wv])
-
+        # Checkpoints with separate wq/wk/wv tensors are fused into the
+        # single wqkv projection at load time.
+        if f"{prefix}wq.weight" not in state_dict:
+            return
         for tensor_suffix in ["weight", "bias"]:
-            wqkv_key = f"{prefix}wqkv.{tensor_suffix}"
-            if wqkv_key in state_dict:
-                wqkv = state_dict.pop(wqkv_key)
-                q_size = self.n_heads * self.head_dim
-                kv_size = self.n_local_heads * self.head_dim
-                wq, wk, wv = torch.split(wqkv, (q_size, kv_size, kv_size), dim=0)
-                state_dict[f"{prefix}wq.{tensor_suffix}"] = wq
-                state_dict[f"{prefix}wk.{tensor_suffix}"] = wk
-                state_dict[f"{prefix}wv.{tensor_suffix}"] = wv
-
-        return
-
-        def _unfuse_wqkv_state_dict(
-            state_dict: Dict[str, torch.Tensor],
-            dim: int,
-        ):
-            for key in list(state_dict):
-                if key.endswith("wqkv.weight"):
-                    tensor = state_dict[key]
-                    wq_key = key.replace("wqkv.weight", "wq.weight")
-                    state_dict[wq_key] = tensor[:dim]
-                    wk_key = key.replace("wqkv.weight", "wk.weight")
-                    wv_key = key.replace("wqkv.weight", "wv.weight")
-                    wk, wv = tensor[dim:].chunk(2, 0)
-                    state_dict[wk_key] = wk
-                    state_dict[wv_key] = wv
-                    state_dict.pop(key)
-                else:
-                    continue
-
-        _unfuse_wqkv_state_dict(state_dict, self.dim)
+            wq_key = f"{prefix}wq.{tensor_suffix}"
+            if wq_key in state_dict:
+                wq = state_dict.pop(wq_key)
+                wk = state_dict.pop(f"{prefix}wk.{tensor_suffix}")
+                wv = state_dict.pop(f"{prefix}wv.{tensor_suffix}")
+                state_dict[f"{prefix}wqkv.{tensor_suffix}"] = torch.cat([wq, wk, wv])
 
     def distribute(self, device_mesh: DeviceMesh):
         self.tp_degree = device_mesh.size()
-        parallelize_module(self.wq, device_mesh, ColwiseParallel())
-        parallelize_module(self.wk, device_mesh, ColwiseParallel())
-        parallelize_module(self.wv, device_mesh, ColwiseParallel())
+        assert self.n_heads % self.tp_degree == 0
+        assert self.n_local_heads % self.tp_degree == 0
+
+        # Reorder the fused rows so each rank's contiguous shard is its own
+        # [q, k, v] block (weights loaded later onto meta-device models are
+        # interleaved by the checkpoint loader instead).
+        if not self.wqkv.weight.is_meta:
+            q_size = self.n_heads * self.head_dim
+            kv_size = self.n_local_heads * self.head_dim
+            self.wqkv.weight.data = interleave_qkv_for_tp(
+                self.wqkv.weight.data, q_size, kv_size, self.tp_degree
+            )
+            if self.wqkv.bias is not None:
+                self.wqkv.bias.data = interleave_qkv_for_tp(
+                    self.wqkv.bias.data, q_size, kv_size, self.tp_degree
+                )
+        parallelize_module(self.wqkv, device_mesh, ColwiseParallel())
         parallelize_module(self.wo, device_mesh, RowwiseParallel())
 
     def forward(
@@ -907,54 +1152,146 @@ class Attention(nn.Module):
         freqs_cis: Tensor,
         mask: Tensor,
         input_pos: Optional[Tensor] = None,
+        start: Optional[int] = None,
         cache_lane: int = 0,
     ) -> Tensor:
         bsz, seqlen, _ = x.shape
 
-        q = self.wq(x)
-        k = self.wk(x)
-        v = self.wv(x)
-        # kv_size = self.n_local_heads * self.head_dim
-        # q, k, v = self.wqkv(x).split([self.dim, kv_size, kv_size], dim=-1)
+        # Under TP each rank's wqkv output holds only its own share of the
+        # heads, so split by the locally-known sharded sizes.
+        q_size = self.n_heads * self.head_dim
+        kv_size = self.n_local_heads * self.head_dim
+        tp_degree = getattr(self, "tp_degree", None)
+        if tp_degree is not None:
+            q_size //= tp_degree
+            kv_size //= tp_degree
+        wqkv = self.wqkv
+        if type(wqkv) is nn.Linear and not hasattr(self, "tp_degree"):
+            # plain Linear: call F.linear directly and skip Module.__call__'s
+            # hook machinery on the hot path. Quantized replacements and
+            # TP-parallelized modules (which rely on hooks) take the module
+            # call below.
+            qkv = F.linear(x, wqkv.weight, wqkv.bias)
+        else:
+            qkv = wqkv(x)
+        q, k, v = qkv.split([q_size, kv_size, kv_size], dim=-1)
 
         # Giving "-1" to view ops so that they infer the correct number of heads
         # from the input tensor.  This is done to support both TP and non-TP
         # cases where the former would divide n_heads by tp_degree.
-        # -1 = self.n_heads
-        q = q.view(bsz, seqlen, -1, self.head_dim)
-        # -1 = self.n_local_heads
-        k = k.view(bsz, seqlen, -1, self.head_dim)
-        # -1 = self.n_local_heads
-        v = v.view(bsz, seqlen, -1, self.head_dim)
+        if seqlen == 1:
+            # Decode specialization: with a single position the (B, S, H, D)
+            # and (B, H, S, D) layouts coincide, so view straight into head
+            # (SDPA) order and skip the three transposes. The rotary
+            # broadcast is position-independent at S == 1.
+            # -1 = self.n_heads / self.n_local_heads
+            q = q.view(bsz, -1, 1, self.head_dim)
+            k = k.view(bsz, -1, 1, self.head_dim)
+            v = v.view(bsz, -1, 1, self.head_dim)
+
+            q = apply_rotary_emb(q, freqs_cis)
+            k = apply_rotary_emb(k, freqs_cis)
+        else:
+            # -1 = self.n_heads
+            q = q.view(bsz, seqlen, -1, self.head_dim)
+            # -1 = self.n_local_heads
+            k = k.view(bsz, seqlen, -1, self.head_dim)
+            # -1 = self.n_local_heads
+            v = v.view(bsz, seqlen, -1, self.head_dim)
 
-        q = apply_rotary_emb(q, freqs_cis)
-        k = apply_rotary_emb(k, freqs_cis)
+            q = apply_rotary_emb(q, freqs_cis)
+            k = apply_rotary_emb(k, freqs_cis)
 
-        q, k, v = (x.transpose(1, 2) for x in (q, k, v))
+            q, k, v = (x.transpose(1, 2) for x in (q, k, v))
 
         if self.kv_cache is not None:
-            k, v = self.kv_cache[cache_lane].update(input_pos, k, v)
-
-        k = k.repeat_interleave(self.n_heads // self.n_local_heads, dim=1)
-        v = v.repeat_interleave(self.n_heads // self.n_local_heads, dim=1)
-        y = F.scaled_dot_product_attention(
-            query=q,
-            key=k,
-            value=v,
-            attn_mask=mask,
-            dropout_p=0.0,
-            # This is None (default) for llama architecture and set for granite
-            # architectures
-            scale=self.attention_scale,
-        )
-
-        # -1 = self.dim
-        y = y.transpose(1, 2).contiguous().view(bsz, seqlen, -1)
+            kv_cache = self.kv_cache[cache_lane]
+            k, v = kv_cache.update(input_pos, k, v, start=start)
+            if kv_cache.quantized:
+                k = kv_cache.dequantize(k, kv_cache.k_scale, q.dtype)
+                v = kv_cache.dequantize(v, kv_cache.v_scale, q.dtype)
+
+        # Let SDPA consume grouped K/V heads directly instead of materializing
+        # repeat_interleave'd copies n_heads/n_local_heads times the cache size
+        gqa_kwargs = {}
+        n_rep = self.n_rep
+        if n_rep > 1:
+            if _SDPA_SUPPORTS_GQA:
+                gqa_kwargs = {"enable_gqa": True}
+            else:
+                k = k.repeat_interleave(n_rep, dim=1)
+                v = v.repeat_interleave(n_rep, dim=1)
+        if mask is None:
+            if self.kv_cache is not None:
+                # attend only over the filled prefix of the cache; causality
+                # over the remaining positions comes from SDPA itself.
+                # mask is only ever None on the contiguous fast paths, where
+                # the caller supplied `start` -- no device read needed here.
+                prefix_len = start + seqlen
+                k = k[:, :, :prefix_len]
+                v = v[:, :, :prefix_len]
+            y = F.scaled_dot_product_attention(
+                query=q,
+                key=k,
+                value=v,
+                is_causal=seqlen > 1,
+                dropout_p=0.0,
+                scale=self.attention_scale,
+                **gqa_kwargs,
+            )
+        else:
+            y = F.scaled_dot_product_attention(
+                query=q,
+                key=k,
+                value=v,
+                attn_mask=mask,
+                dropout_p=0.0,
+                # This is None (default) for llama architecture and set for
+                # granite architectures
+                scale=self.attention_scale,
+                **gqa_kwargs,
+            )
 
-        y = self.wo(y)
+        wo = self.wo
+        if (
+            type(wo) is nn.Linear
+            and not hasattr(self, "tp_degree")
+            and not torch.compiler.is_compiling()
+        ):
+            # head-concat reshape fused into the output projection
+            y = _attn_out_proj_fused(y, wo.weight, wo.bias)
+        else:
+            # -1 = self.dim. reshape copies only when it must: for the
+            # seqlen==1 decode step the transposed layout is already viewable
+            # (size-1 dims don't constrain contiguity), so no copy happens.
+            y = y.transpose(1, 2).reshape(bsz, seqlen, -1)
+            y = wo(y)
         return y
 
 
+def _attn_out_proj_math(y: Tensor, weight: Tensor, bias: Optional[Tensor]) -> Tensor:
+    # BHSD -> BS(HD) reshape feeding straight into the output GEMM
+    return F.linear(y.transpose(1, 2).flatten(2), weight, bias)
+
+
+# compiled so Inductor folds the strided head-concat into the GEMM prologue
+# instead of materializing the reshaped attention output first
+_attn_out_proj_fused = torch.compile(
+    _attn_out_proj_math, mode="reduce-overhead", fullgraph=True
+)
+
+
+def _silu_gate_math(gate: Tensor, up: Tensor) -> Tensor:
+    return F.silu(gate) * up
+
+
+# one fused elementwise kernel for the SwiGLU gate instead of writing the
+# hidden_dim-wide silu output to memory and reading it back for the multiply
+_silu_gate_fused = torch.compile(
+    _silu_gate_math, mode="reduce-overhead", fullgraph=True
+)
+
+
 class FeedForward(nn.Module):
     def __init__(self, config: TransformerArgs) -> None:
         super().__init__()
@@ -974,7 +1311,10 @@ class FeedForward(nn.Module):
         parallelize_module(self.w3, device_mesh, ColwiseParallel())
 
     def forward(self, x: Tensor) -> Tensor:
-        return self.w2(F.silu(self.w1(x)) * self.w3(x))
+        if torch.compiler.is_compiling():
+            # an enclosing compile fuses the whole expression itself
+            return self.w2(F.silu(self.w1(x)) * self.w3(x))
+        return self.w2(_silu_gate_fused(self.w1(x), self.w3(x)))
 
 
 def apply_scaling(freqs: torch.Tensor, rope_scaling: Dict[str, Any]):
@@ -997,50 +1337,63 @@ def apply_scaling(freqs: torch.Tensor, rope_scaling: Dict[str, Any]):
 
     low_freq_wavelen = old_context_len / low_freq_factor
     high_freq_wavelen = old_context_len / high_freq_factor
-    new_freqs = []
-    for freq in freqs:
-        wavelen = 2 * torch.pi / freq
-        if wavelen < high_freq_wavelen:
-            new_freqs.append(freq)
-        elif wavelen > low_freq_wavelen:
-            new_freqs.append(freq / scale_factor)
-        else:
-            assert low_freq_wavelen != high_freq_wavelen
-            smooth = (old_context_len / wavelen - low_freq_factor) / (
-                high_freq_factor - low_freq_factor
-            )
-            new_freqs.append((1 - smooth) * freq / scale_factor + smooth * freq)
-    return torch.tensor(new_freqs, dtype=freqs.dtype, device=freqs.device)
+    assert low_freq_wavelen != high_freq_wavelen
+
+    # fully vectorized piecewise blend: no Python loop, no host sync, and
+    # traceable by torch.compile/torch.export
+    wavelen = 2 * torch.pi / freqs
+    smooth = (old_context_len / wavelen - low_freq_factor) / (
+        high_freq_factor - low_freq_factor
+    )
+    mid_freqs = (1 - smooth) * freqs / scale_factor + smooth * freqs
+    return torch.where(
+        wavelen < high_freq_wavelen,
+        freqs,
+        torch.where(wavelen > low_freq_wavelen, freqs / scale_factor, mid_freqs),
+    )
 
 
+@torch.no_grad()
 def precompute_freqs_cis(
     n_elem: int,
     seq_len: int,
     base: int = 10000,
     dtype=None,
     rope_scaling: Optional[Dict[str, Any]] = None,
+    device=None,
 ) -> Tensor:
     if not dtype:
         dtype = get_precision()
+    # build everything on the target device up front: no default-device
+    # tensors to transfer and no autograd tracking, so the whole table is
+    # graph/capture friendly
     freqs = 1.0 / (
-        base ** (torch.arange(0, n_elem, 2)[: (n_elem // 2)].float() / n_elem)
+        base
+        ** (torch.arange(0, n_elem, 2, device=device)[: (n_elem // 2)].float() / n_elem)
     )
     t = torch.arange(seq_len, device=freqs.device)
     if rope_scaling is not None:
         freqs = apply_scaling(freqs, rope_scaling)
     freqs = torch.outer(t, freqs)
-    freqs_cis = torch.polar(torch.ones_like(freqs), freqs)
-    cache = torch.stack([freqs_cis.real, freqs_cis.imag], dim=-1)
+    # cos/sin computed directly: polar() built a complex intermediate (plus a
+    # ones_like) only to immediately split it back into real/imag
+    cache = torch.stack([torch.cos(freqs), torch.sin(freqs)], dim=-1)
     return cache.to(dtype=dtype)
 
 
-def apply_rotary_emb(x: Tensor, freqs_cis: Tensor) -> Tensor:
-    xshaped = x.float().reshape(*x.shape[:-1], -1, 2)
-    freqs_cis = freqs_cis.view(1, xshaped.size(1), 1, xshaped.size(3), 2)
+def _rotary_emb_math(x: Tensor, freqs_cis: Tensor) -> Tensor:
+    # math stays in the activation dtype: the old float() upcast doubled the
+    # bytes moved through a purely memory-bound op
+    xshaped = x.reshape(*x.shape[:-1], -1, 2)
+    if freqs_cis.dim() != 5:
+        # callers that haven't pre-broadcast the table (e.g. export helpers)
+        freqs_cis = freqs_cis.view(1, xshaped.size(1), 1, xshaped.size(3), 2)
+    x0, x1 = xshaped.unbind(-1)
+    cos, sin = freqs_cis.unbind(-1)
     x_out2 = torch.stack(
         [
-            xshaped[..., 0] * freqs_cis[..., 0] - xshaped[..., 1] * freqs_cis[..., 1],
-            xshaped[..., 1] * freqs_cis[..., 0] + xshaped[..., 0] * freqs_cis[..., 1],
+            x0 * cos - x1 * sin,
+            x1 * cos + x0 * sin,
         ],
         -1,
     )
@@ -1049,6 +1402,18 @@ def apply_rotary_emb(x: Tensor, freqs_cis: Tensor) -> Tensor:
     return x_out2.type_as(x)
 
 
+_rotary_emb_fused = torch.compile(
+    _rotary_emb_math, mode="reduce-overhead", fullgraph=True
+)
+
+
+def apply_rotary_emb(x: Tensor, freqs_cis: Tensor) -> Tensor:
+    if torch.compiler.is_compiling():
+        # inside an enclosing compile/export trace: inline the plain math
+        return _rotary_emb_math(x, freqs_cis)
+    return _rotary_emb_fused(x, freqs_cis)
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ExecuTorch model components
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -608,10 +608,19 @@ def load_model_and_state_dict(
     }
 
     state_dict = {}
+    # q/k/v projections are fused into a single wqkv Linear in the model;
+    # collect the pieces per attention module and fuse them after this loop.
+    qkv_pieces = {}
     for fqn in weight_map:
         assert _fqn_last(fqn) == "weight"
         fqn = _fqn_up(fqn)
 
+        if _fqn_last(fqn) in ("wq", "wk", "wv"):
+            qkv_pieces.setdefault(_fqn_up(fqn), {})[_fqn_last(fqn)] = weight_map[
+                f"{fqn}.weight"
+            ]
+            continue
+
         mod = _fqn_lookup(fqn, model)
         t = weight_map[f"{fqn}.weight"]
 
@@ -657,6 +666,67 @@ def load_model_and_state_dict(
             if load_state_dict:
                 state_dict[f"{fqn}.weight"] = to_float(t)
 
+    for attn_fqn, pieces in qkv_pieces.items():
+        piece_tensors = [pieces[name] for name in ("wq", "wk", "wv")]
+        wqkv_fqn = f"{attn_fqn}.wqkv"
+        mod = _fqn_lookup(wqkv_fqn, model)
+
+        if (
+            isinstance(mod, torch.nn.Linear)
+            and load_as_quantized
+            and all(
+                t.tensor_type == gguf.GGMLQuantizationType.Q4_0
+                for t in piece_tensors
+            )
+        ):
+            # Keep the GGUF Q4_0 quantization on the fused projection: unpack
+            # the pieces, concatenate along out_features (the group structure
+            # runs along in_features, which row-concat leaves untouched) and
+            # repack into one WeightOnlyInt4Linear.
+            assert not mod.bias
+            out_features = mod.out_features
+            in_features = mod.in_features
+            assert all(t.shape[0] == in_features for t in piece_tensors)
+            assert sum(t.shape[1] for t in piece_tensors) == out_features
+
+            if load_state_dict:
+                unpacked = [Q4_0.unpack(t) for t in piece_tensors]
+                q = torch.cat([piece_q for piece_q, _, _ in unpacked])
+                scales_and_zeros = pack_scales_and_zeros(
+                    torch.cat([s for _, s, _ in unpacked]),
+                    torch.cat([z for _, _, z in unpacked]),
+                )
+                if is_device(q.device.type, "cpu"):
+                    weight_int4pack = torch.ops.aten._convert_weight_to_int4pack_for_cpu(
+                        q, inner_k_tiles
+                    )
+                else:
+                    q_tmp = (q[::, ::2] << 4 | q[::, 1::2]).to(torch.uint8)
+                    weight_int4pack = torch.ops.aten._convert_weight_to_int4pack(
+                        q_tmp, inner_k_tiles
+                    )
+                state_dict[f"{wqkv_fqn}.weight"] = weight_int4pack
+                state_dict[f"{wqkv_fqn}.scales_and_zeros"] = scales_and_zeros
+
+            parent = _fqn_lookup(attn_fqn, model)
+            setattr(
+                parent,
+                "wqkv",
+                WeightOnlyInt4Linear(
+                    in_features=in_features,
+                    out_features=out_features,
+                    bias=False,
+                    device="cpu",
+                    groupsize=Q4_0.groupsize,
+                    inner_k_tiles=inner_k_tiles,
+                ),
+            )
+        elif load_state_dict:
+            # mixed or unsupported piece quantization: emit float pieces and
+            # let Attention.load_hook concatenate them
+            for name, t in pieces.items():
+                state_dict[f"{attn_fqn}.{name}.weight"] = to_float(t)
+
     assert (state_dict == {}) == (not load_state_dict)
     return model, state_dict
 